@@ -27,6 +27,8 @@ class PostgresConfig:
         self.password = password or self._read_password()
         self.min_conn = min_conn
         self.max_conn = max_conn
+        # Server-side prepared statements (выключить для PgBouncer transaction pooling)
+        self.prepared_statements = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
 
     @staticmethod
     def _read_password() -> str:
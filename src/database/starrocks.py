@@ -5,17 +5,51 @@ StarRocks использует MySQL-протокол, поэтому подкл
 """
 
 import os
+import time
+from collections.abc import Generator, Iterable, Iterator, Sequence
 from contextlib import contextmanager
-from collections.abc import Generator
+from functools import lru_cache
+from itertools import chain, islice
 from typing import Any
 
 import pymysql
 from pymysql.connections import Connection
-from pymysql.cursors import DictCursor
+from pymysql.cursors import Cursor, DictCursor, SSDictCursor
 
 from src.logger.logger import get_logger
 from src.logger.types import Category, param
 
+# Лимит placeholders в одном statement (MySQL-протокол)
+MAX_PLACEHOLDERS = 65535
+
+# Адаптивный размер батча для bulk insert (строк на statement):
+# стартуем с DEFAULT, удваиваем пока батч укладывается в TARGET секунд,
+# уменьшаем вдвое на медленных батчах и таймаутах/обрывах, но не ниже MIN
+DEFAULT_INSERT_BATCH_SIZE = 10_000
+MIN_INSERT_BATCH_SIZE = 500
+INSERT_BATCH_TARGET_SECONDS = 0.5
+
+# Размер пачки при потоковом чтении (fetch_iter)
+DEFAULT_FETCH_ARRAYSIZE = 10_000
+
+# Коды потери соединения (CR_SERVER_GONE_ERROR, CR_SERVER_LOST):
+# read-запросы после них переподключаются и повторяются один раз
+RECONNECT_ERROR_CODES = frozenset({2006, 2013})
+
+
+@lru_cache(maxsize=64)
+def _insert_sql_parts(table: str, columns: tuple[str, ...]) -> tuple[str, str]:
+    """Префикс INSERT и группа placeholders одной строки (кешируется по таблице/колонкам)."""
+    columns_sql = ", ".join(f"`{c}`" for c in columns)
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return f"INSERT INTO {table} ({columns_sql}) VALUES ", row_sql
+
+
+def _build_insert_sql(table: str, columns: tuple[str, ...], row_count: int) -> str:
+    """Собирает multi-row INSERT на row_count строк."""
+    prefix, row_sql = _insert_sql_parts(table, columns)
+    return prefix + ", ".join([row_sql] * row_count)
+
 
 class StarRocksConfig:
     """StarRocks connection configuration."""
@@ -31,6 +65,7 @@ class StarRocksConfig:
         read_timeout: int = 30,
         write_timeout: int = 30,
         charset: str = "utf8mb4",
+        ping_interval: float = 30.0,
     ) -> None:
         self.host = host or os.getenv("STARROCKS_HOST", "starrocks")
         self.port = port or int(os.getenv("STARROCKS_PORT", "9030"))
@@ -41,6 +76,8 @@ class StarRocksConfig:
         self.read_timeout = read_timeout
         self.write_timeout = write_timeout
         self.charset = charset
+        # Проверять соединение (ping) только после простоя дольше этого (сек)
+        self.ping_interval = ping_interval
 
     @staticmethod
     def _read_user() -> str:
@@ -93,6 +130,8 @@ class StarRocksClient:
         """
         self.config = config or StarRocksConfig()
         self._connection: Connection | None = None
+        self._last_used = 0.0
+        self._insert_batch_size = DEFAULT_INSERT_BATCH_SIZE
         self.logger = get_logger().with_category(Category.STARROCKS)
 
     async def connect(self) -> None:
@@ -125,33 +164,102 @@ class StarRocksClient:
             finally:
                 self._connection = None
 
-    def _ensure_connected(self) -> Connection:
-        """Ensure we have a valid connection, reconnect if needed."""
+    def _ensure_connected(self, force_ping: bool = False) -> Connection:
+        """Ensure we have a valid connection, reconnect if needed.
+
+        Соединение долгоживущее: ping (лишний round-trip) делаем только
+        если оно простаивало дольше ping_interval или уже известно, что оно
+        закрыто, а не перед каждым запросом. _last_used обновляется только
+        после успешного запроса (см. _track_usage).
+
+        Цена: обрыв соединения, случившийся раньше ping_interval, замечается
+        только на самом запросе. Read-запросы (fetch_*) в этом случае
+        переподключаются и повторяются один раз (см. _execute_read);
+        execute/insert_many не повторяются и падают с OperationalError,
+        следующий вызов переподключится.
+        """
         if self._connection is None:
             raise RuntimeError("StarRocks not connected. Call connect() first.")
 
-        # Check if connection is still alive, reconnect if needed
-        try:
-            self._connection.ping(reconnect=True)
-        except pymysql.Error as e:
-            self.logger.warn(
-                "StarRocks connection lost, reconnecting...",
-                param("error", str(e)),
-            )
-            self._connection = pymysql.connect(**self.config.to_dict())
+        idle = time.monotonic() - self._last_used
+        if force_ping or not self._connection.open or idle > self.config.ping_interval:
+            # Check if connection is still alive, reconnect if needed
+            try:
+                self._connection.ping(reconnect=True)
+            except pymysql.Error as e:
+                self.logger.warn(
+                    "StarRocks connection lost, reconnecting...",
+                    param("error", str(e)),
+                )
+                self._connection = pymysql.connect(**self.config.to_dict())
 
         return self._connection
 
+    @contextmanager
+    def _track_usage(self) -> Generator[None, None, None]:
+        """Отмечает успешное использование соединения.
+
+        При ошибке соединения сбрасывает _last_used, чтобы следующий
+        вызов _ensure_connected сделал ping и переподключился.
+        """
+        try:
+            yield
+        except (pymysql.OperationalError, pymysql.InterfaceError):
+            self._last_used = 0.0
+            raise
+        self._last_used = time.monotonic()
+
     @contextmanager
     def cursor(self) -> Generator[DictCursor, None, None]:
         """Get cursor context manager."""
         conn = self._ensure_connected()
         cursor = conn.cursor()
         try:
-            yield cursor
+            with self._track_usage():
+                yield cursor
         finally:
             cursor.close()
 
+    def _execute_read(
+        self,
+        query: str,
+        params: tuple[Any, ...] | None = None,
+        cursor_class: type[Cursor] | None = None,
+    ) -> Cursor:
+        """
+        Выполняет read-запрос и возвращает cursor с результатом.
+
+        При потере соединения (RECONNECT_ERROR_CODES) переподключается и
+        повторяет запрос один раз. Закрыть cursor должен вызывающий.
+        """
+        try:
+            return self._open_cursor(query, params, cursor_class)
+        except pymysql.OperationalError as e:
+            if e.args[0] not in RECONNECT_ERROR_CODES:
+                raise
+            self.logger.warn(
+                "StarRocks connection lost, retrying query",
+                param("error", str(e)),
+            )
+        # _track_usage сбросил _last_used: _ensure_connected сделает ping(reconnect=True)
+        return self._open_cursor(query, params, cursor_class)
+
+    def _open_cursor(
+        self,
+        query: str,
+        params: tuple[Any, ...] | None,
+        cursor_class: type[Cursor] | None,
+    ) -> Cursor:
+        """Открывает cursor и выполняет на нём query (cursor закрывается при ошибке)."""
+        cursor = self._ensure_connected().cursor(cursor_class)
+        try:
+            with self._track_usage():
+                cursor.execute(query, params)
+        except BaseException:
+            cursor.close()
+            raise
+        return cursor
+
     def execute(self, query: str, params: tuple[Any, ...] | None = None) -> int:
         """
         Execute query without returning results.
@@ -167,6 +275,78 @@ class StarRocksClient:
             cursor.execute(query, params)
             return cursor.rowcount
 
+    def insert_many(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[tuple[Any, ...]],
+        batch_size: int | None = None,
+    ) -> int:
+        """
+        Bulk insert через multi-row INSERT ... VALUES (...), (...).
+
+        Один statement на батч вместо отдельного INSERT на строку.
+        Размер батча ограничен лимитом placeholders MySQL-протокола.
+        Без явного batch_size размер подстраивается по времени
+        выполнения предыдущего батча.
+
+        Args:
+            table: Имя таблицы
+            columns: Список колонок
+            rows: Строки (tuple значений в порядке columns); читаются лениво,
+                в памяти держится не больше одного батча
+            batch_size: Фиксированный размер батча (None - адаптивный)
+
+        Returns:
+            Number of inserted rows
+
+        Raises:
+            ValueError: Если columns пустой или batch_size < 1
+        """
+        column_names = tuple(columns)
+        if not column_names:
+            raise ValueError("insert_many requires at least one column")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+        max_rows = MAX_PLACEHOLDERS // len(column_names)
+        adaptive = batch_size is None
+        rows_iter = iter(rows)
+
+        total = 0
+        with self.cursor() as cursor:
+            while True:
+                chunk_size = min(
+                    self._insert_batch_size if batch_size is None else batch_size, max_rows
+                )
+                chunk = list(islice(rows_iter, chunk_size))
+                if not chunk:
+                    break
+                query = _build_insert_sql(table, column_names, len(chunk))
+
+                started = time.monotonic()
+                try:
+                    cursor.execute(query, tuple(chain.from_iterable(chunk)))
+                except pymysql.OperationalError:
+                    # Таймауты/обрывы - признак слишком большого батча;
+                    # ошибки данных (IntegrityError, DataError...) размер не трогают
+                    if adaptive:
+                        self._shrink_insert_batch_size()
+                    raise
+                elapsed = time.monotonic() - started
+
+                if adaptive:
+                    if elapsed > 2 * INSERT_BATCH_TARGET_SECONDS:
+                        self._shrink_insert_batch_size()
+                    elif elapsed < INSERT_BATCH_TARGET_SECONDS and len(chunk) == chunk_size:
+                        self._insert_batch_size = min(self._insert_batch_size * 2, max_rows)
+
+                total += cursor.rowcount
+        return total
+
+    def _shrink_insert_batch_size(self) -> None:
+        """Уменьшает адаптивный размер батча вдвое (не ниже минимума)."""
+        self._insert_batch_size = max(self._insert_batch_size // 2, MIN_INSERT_BATCH_SIZE)
+
     def fetch_one(
         self, query: str, params: tuple[Any, ...] | None = None
     ) -> dict[str, Any] | None:
@@ -180,9 +360,11 @@ class StarRocksClient:
         Returns:
             Dict with column names as keys, or None
         """
-        with self.cursor() as cursor:
-            cursor.execute(query, params)
+        cursor = self._execute_read(query, params)
+        try:
             return cursor.fetchone()  # type: ignore[return-value]
+        finally:
+            cursor.close()
 
     def fetch_all(
         self, query: str, params: tuple[Any, ...] | None = None
@@ -197,14 +379,50 @@ class StarRocksClient:
         Returns:
             List of dicts with column names as keys
         """
-        with self.cursor() as cursor:
-            cursor.execute(query, params)
+        cursor = self._execute_read(query, params)
+        try:
             return cursor.fetchall()  # type: ignore[return-value]
+        finally:
+            cursor.close()
+
+    def fetch_iter(
+        self,
+        query: str,
+        params: tuple[Any, ...] | None = None,
+        arraysize: int = DEFAULT_FETCH_ARRAYSIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Execute query and stream results.
+
+        Использует unbuffered cursor (SSDictCursor): строки читаются
+        с сервера пачками по arraysize, а не буферизуются целиком.
+        Генератор нужно дочитать или закрыть до следующего запроса
+        на этом соединении.
+
+        Ранний выход не бесплатен: cursor.close() на unbuffered cursor
+        вычитывает (и отбрасывает) весь остаток результата с сервера.
+        Если нужна только часть строк, ограничьте её в запросе (LIMIT).
+
+        Args:
+            query: SQL query
+            params: Query parameters
+            arraysize: Number of rows fetched per round
+
+        Yields:
+            Dicts with column names as keys
+        """
+        cursor = self._execute_read(query, params, SSDictCursor)
+        try:
+            with self._track_usage():
+                while rows := cursor.fetchmany(arraysize):
+                    yield from rows
+        finally:
+            cursor.close()
 
     def ping(self) -> bool:
         """Check if connection is alive."""
         try:
-            self._ensure_connected()
+            self._ensure_connected(force_ping=True)
             return True
         except (pymysql.Error, RuntimeError):
             return False
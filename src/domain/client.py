@@ -5,6 +5,8 @@ from datetime import datetime
 from typing import Any
 from uuid import UUID
 
+from src.utils.time import utcnow
+
 
 @dataclass
 class Client:
@@ -26,9 +28,9 @@ class Client:
     config_confirmed_by: str | None = None
     config_confirmed_at: datetime | None = None
     source: str | None = None
-    created_at: datetime = field(default_factory=datetime.utcnow)
-    updated_at: datetime = field(default_factory=datetime.utcnow)
-    synced_at: datetime = field(default_factory=datetime.utcnow)
+    created_at: datetime = field(default_factory=utcnow)
+    updated_at: datetime = field(default_factory=utcnow)
+    synced_at: datetime = field(default_factory=utcnow)
 
     def is_feature_enabled(self, feature: str) -> bool:
         """Check if a feature is enabled for this client."""
@@ -56,6 +58,8 @@ class Client:
         updated_at = cls._parse_timestamp(data.get("updated_at"))
         config_confirmed_at = cls._parse_timestamp(data.get("config_confirmed_at"))
 
+        now = utcnow()
+
         return cls(
             id=UUIDType(data["id"]),
             name=data.get("name", ""),
@@ -68,9 +72,9 @@ class Client:
             config_confirmed_by=data.get("config_confirmed_by"),
             config_confirmed_at=config_confirmed_at,
             source=data.get("source"),
-            created_at=created_at or datetime.utcnow(),
-            updated_at=updated_at or datetime.utcnow(),
-            synced_at=datetime.utcnow(),
+            created_at=created_at or now,
+            updated_at=updated_at or now,
+            synced_at=now,
         )
 
     @staticmethod
@@ -1,6 +1,7 @@
 """Event subscriber for Redis Streams."""
 
 import asyncio
+import inspect
 import json
 from collections.abc import Awaitable, Callable
 from typing import Any
@@ -9,6 +10,9 @@ from src.events.client import RedisClient
 from src.logger.logger import get_logger
 from src.logger.types import Category, param
 
+# Handler может быть как async, так и sync функцией
+EventHandlerFunc = Callable[[dict[str, Any]], Awaitable[None] | None]
+
 
 class EventSubscriber:
     """
@@ -42,12 +46,12 @@ class EventSubscriber:
         self._stopped = False
         self.logger = get_logger().with_category(Category.MESSENGER)
 
-    async def consume(self, handler: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+    async def consume(self, handler: EventHandlerFunc) -> None:
         """
         Start consuming events from Redis Streams.
 
         Args:
-            handler: Async function to handle each event
+            handler: Async or sync function to handle each event
         """
         redis = self.redis_client.get_redis()
 
@@ -110,7 +114,7 @@ class EventSubscriber:
         stream: str,
         message_id: str,
         message_data: dict[str, Any],
-        handler: Callable[[dict[str, Any]], Awaitable[None]],
+        handler: EventHandlerFunc,
     ) -> None:
         """
         Handle single message from stream.
@@ -133,8 +137,11 @@ class EventSubscriber:
                 param("client_id", event.get("client_id")),
             )
 
-            # Обрабатываем событие через handler
-            await handler(event)
+            # Обрабатываем событие через handler. Проверяем результат, а не
+            # сам handler: lambda/callable/декоратор тоже могут вернуть coroutine
+            result = handler(event)
+            if inspect.isawaitable(result):
+                await result
 
             # ACK сообщение после успешной обработки
             redis = self.redis_client.get_redis()
@@ -176,6 +183,7 @@ class EventSubscriber:
         # Парсим data из JSON string
         data_json = message_data.get("data", "{}")
         try:
+            # json, а не orjson: orjson молча превращает int > 64 бит во float
             event["data"] = json.loads(data_json)
         except json.JSONDecodeError:
             event["data"] = {}
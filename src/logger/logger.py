@@ -1,15 +1,16 @@
 """Основной logger для структурированного логирования."""
 
+import asyncio
 import inspect
 import os
 import traceback
 import uuid
-from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from src.logger.postgres_writer import PostgresWriter
 from src.logger.types import Category, Field, Level, LogEntry
+from src.utils.time import utcnow
 
 
 class Logger:
@@ -93,8 +94,11 @@ class Logger:
             file_path = self._clean_file_path(caller_frame.f_code.co_filename)
             line_number = caller_frame.f_lineno
 
-        # Формируем context из полей
-        context: dict[str, Any] = dict(self._fields)
+        # Формируем context из полей.
+        # LogEntry нельзя переиспользовать между вызовами: writer держит ссылку
+        # на запись в буфере до flush. Поэтому экономим на промежуточных
+        # объектах - context копируется только если есть поля.
+        context: dict[str, Any] | None = dict(self._fields) if self._fields else None
         category = self._category
 
         for field in fields:
@@ -103,16 +107,20 @@ class Logger:
                 if isinstance(field.value, Category):
                     category = field.value
                 continue
+            if context is None:
+                context = {}
             context[field.key] = field.value
 
         # Извлекаем duration_ms если есть
-        duration_ms = context.pop("duration_ms", None)
+        duration_ms = context.pop("duration_ms", None) if context else None
         if duration_ms is not None:
             duration_ms = int(duration_ms)
 
-        # Создаём запись лога
+        # Создаём запись лога (одно чтение часов на timestamp и ingestion_time)
+        now = utcnow()
         entry = LogEntry(
-            timestamp=datetime.utcnow(),
+            timestamp=now,
+            ingestion_time=now,
             service_name=self.service_name,
             instance_id=self.instance_id,
             node_name=self.node_name,
@@ -143,8 +151,6 @@ class Logger:
         if self.writer:
             try:
                 # Используем asyncio.create_task для async write
-                import asyncio
-
                 try:
                     loop = asyncio.get_running_loop()
                     loop.create_task(self.writer.write(entry))
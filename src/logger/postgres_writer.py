@@ -8,6 +8,7 @@ from collections.abc import Sequence
 from contextlib import asynccontextmanager
 from typing import Any
 
+import orjson
 import psycopg2.extras
 from psycopg2.extensions import connection as Connection
 
@@ -119,7 +120,11 @@ class PostgresWriter:
                     entry.message,
                     entry.error_message,
                     entry.stack_trace,
-                    (json.dumps(entry.context) if entry.context is not None else None),
+                    (
+                        orjson.dumps(entry.context, option=orjson.OPT_NON_STR_KEYS).decode()
+                        if entry.context is not None
+                        else None
+                    ),
                     entry.duration_ms,
                     entry.ingestion_time,
                 )
@@ -5,6 +5,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any
 
+from src.utils.time import utcnow
+
 
 class Level(str, Enum):
     """Log level определяет уровень важности лога."""
@@ -41,7 +43,7 @@ class LogEntry:
     environment: str
     level: Level
     message: str
-    ingestion_time: datetime = field(default_factory=datetime.utcnow)
+    ingestion_time: datetime = field(default_factory=utcnow)
     node_name: str | None = None
     category: Category | None = None
     trace_id: str | None = None
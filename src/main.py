@@ -8,7 +8,6 @@ Event-driven consumer без HTTP/gRPC серверов.
 import asyncio
 import contextlib
 import signal
-from functools import partial
 
 from src.config.settings import Settings
 from src.database.postgres import PostgresClient
@@ -107,7 +106,7 @@ async def main() -> None:
     )
 
     # Setup graceful shutdown
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     shutdown_event = asyncio.Event()
 
     def signal_handler(sig: int) -> None:
@@ -115,7 +114,7 @@ async def main() -> None:
         shutdown_event.set()
 
     for sig in (signal.SIGTERM, signal.SIGINT):
-        loop.add_signal_handler(sig, partial(signal_handler, sig))
+        loop.add_signal_handler(sig, signal_handler, sig)
 
     # Application started - healthcheck will pass now (python is running)
     logger.info(
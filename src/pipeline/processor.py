@@ -6,9 +6,13 @@ from typing import Any
 class EventProcessor:
     """Stub EventProcessor class."""
 
+    __slots__ = ("postgres", "publisher", "settings")
+
     def __init__(self, postgres: Any, publisher: Any, settings: Any) -> None:
-        pass
+        self.postgres = postgres
+        self.publisher = publisher
+        self.settings = settings
 
-    async def process_event(self, event: Any) -> None:
+    def process_event(self, event: Any) -> None:
         """Process event."""
         pass
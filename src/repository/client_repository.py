@@ -1,16 +1,148 @@
 """Client repository for PostgreSQL."""
 
-import json
+import time
+import weakref
+from collections.abc import Generator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Any
 from uuid import UUID
 
-from psycopg2.extras import RealDictCursor
+import orjson
+import psycopg2.extras
+from psycopg2.errors import UniqueViolation
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+from psycopg2.extensions import connection as Connection
+from psycopg2.extensions import cursor as Cursor
+from psycopg2.extras import Json, execute_values
 
 from src.database.postgres import PostgresClient
 from src.domain.client import Client
 from src.logger.logger import get_logger
 from src.logger.types import Category, param
 
+# Адаптер psycopg2 (C-level): UUID передаётся и читается как uuid без str()
+psycopg2.extras.register_uuid()
+
+
+def _dumps_json(obj: Any) -> str:
+    """JSON encoder для psycopg2 Json adapter (нестроковые ключи -> str, как json.dumps)."""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# SQL собирается один раз при импорте модуля, а не на каждый вызов
+
+_COLUMNS_SQL = """
+    id, name, organization_id, contact_email, contact_phone,
+    status, features_enabled, config_confirmed, config_confirmed_by,
+    config_confirmed_at, source, created_at, updated_at, synced_at
+"""
+
+_ON_CONFLICT_SQL = """
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name,
+        organization_id = EXCLUDED.organization_id,
+        contact_email = EXCLUDED.contact_email,
+        contact_phone = EXCLUDED.contact_phone,
+        status = EXCLUDED.status,
+        features_enabled = EXCLUDED.features_enabled,
+        config_confirmed = EXCLUDED.config_confirmed,
+        config_confirmed_by = EXCLUDED.config_confirmed_by,
+        config_confirmed_at = EXCLUDED.config_confirmed_at,
+        source = EXCLUDED.source,
+        updated_at = EXCLUDED.updated_at,
+        synced_at = EXCLUDED.synced_at
+"""
+
+_UPSERT_SQL = f"""
+    INSERT INTO clients ({_COLUMNS_SQL})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    {_ON_CONFLICT_SQL}
+"""
+
+_UPSERT_MANY_SQL = f"""
+    INSERT INTO clients ({_COLUMNS_SQL})
+    VALUES %s
+    {_ON_CONFLICT_SQL}
+"""
+
+# TTL кеша get_clients_with_feature (сек)
+_FEATURE_CACHE_TTL = 30.0
+
+# Оптимистичный INSERT без ON CONFLICT (для заведомо новых клиентов).
+# SAVEPOINT в том же statement: при UniqueViolation откатываемся к нему
+# и делаем UPDATE, не теряя остальную транзакцию
+_INSERT_NEW_SQL = f"""
+    SAVEPOINT client_insert;
+    INSERT INTO clients ({_COLUMNS_SQL})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+    RELEASE SAVEPOINT client_insert;
+"""
+
+_UPDATE_SQL = """
+    UPDATE clients SET
+        name = %s,
+        organization_id = %s,
+        contact_email = %s,
+        contact_phone = %s,
+        status = %s,
+        features_enabled = %s,
+        config_confirmed = %s,
+        config_confirmed_by = %s,
+        config_confirmed_at = %s,
+        source = %s,
+        updated_at = %s,
+        synced_at = %s
+    WHERE id = %s
+"""
+
+# Prepared statement для upsert: PREPARE живёт в рамках соединения (сессии),
+# поэтому готовим его один раз на каждое соединение из пула
+_UPSERT_STATEMENT = "client_upsert"
+
+_PREPARE_UPSERT_SQL = f"""
+    PREPARE {_UPSERT_STATEMENT} (
+        uuid, text, text, text, text,
+        text, jsonb, boolean, text,
+        timestamptz, text, timestamptz, timestamptz, timestamptz
+    ) AS
+    INSERT INTO clients ({_COLUMNS_SQL})
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+    {_ON_CONFLICT_SQL}
+"""
+
+_EXECUTE_UPSERT_SQL = (
+    f"EXECUTE {_UPSERT_STATEMENT} (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+_SELECT_BY_ID_SQL = f"""
+    SELECT {_COLUMNS_SQL}
+    FROM clients
+    WHERE id = %s
+"""
+
+_SELECT_MANY_SQL = f"""
+    SELECT {_COLUMNS_SQL}
+    FROM clients
+    WHERE id = ANY(%s::uuid[])
+"""
+
+_SELECT_ACTIVE_SQL = f"""
+    SELECT {_COLUMNS_SQL}
+    FROM clients
+    WHERE status = 'active'
+    ORDER BY name
+"""
+
+# JSONB query: features_enabled->>'feature_name' = 'true'
+_SELECT_WITH_FEATURE_SQL = f"""
+    SELECT {_COLUMNS_SQL}
+    FROM clients
+    WHERE status = 'active'
+      AND (features_enabled->>%s)::boolean = true
+    ORDER BY name
+"""
+
 
 class ClientRepository:
     """Repository for Client CRUD operations in PostgreSQL."""
@@ -25,62 +157,90 @@ class ClientRepository:
         self.postgres = postgres_client
         self.logger = get_logger().with_category(Category.DATABASE)
 
-    def upsert(self, client: Client) -> None:
+        # Соединения, на которых уже есть prepared statement для upsert.
+        # Выключается через DB_PREPARED_STATEMENTS=false (PgBouncer в
+        # transaction pooling не сохраняет PREPARE между транзакциями)
+        self.use_prepared_statements = self.postgres.config.prepared_statements
+        self._prepared_conns: weakref.WeakSet[Connection] = weakref.WeakSet()
+
+        # Соединение открытой транзакции (см. transaction()). ContextVar, а не
+        # атрибут: каждая asyncio task / поток видит только свою транзакцию
+        self._tx_conn: ContextVar[Connection | None] = ContextVar(
+            f"client_repository_tx_{id(self)}", default=None
+        )
+
+        # Кеш get_clients_with_feature: feature -> (monotonic time, clients).
+        # Сбрасывается при upsert; другие реплики видят изменения не позже TTL
+        self._feature_cache: dict[str, tuple[float, list[Client]]] = {}
+
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        """
+        Объединяет несколько операций репозитория в одну транзакцию.
+
+        Внутри блока методы используют одно соединение и не делают
+        commit/rollback сами: commit - один раз при выходе из блока,
+        rollback - при исключении. Транзакция привязана к текущему
+        контексту (contextvars): другие asyncio tasks и потоки её не видят,
+        даже если внутри блока есть await. Tasks, созданные внутри блока,
+        наследуют контекст и попадают в ту же транзакцию.
+
+        Raises:
+            RuntimeError: If a transaction is already open, or if it was
+                aborted by an error that the caller caught inside the block
+        """
+        if self._tx_conn.get() is not None:
+            raise RuntimeError("Nested transactions are not supported")
+
+        conn = self.postgres.get_connection()
+        token = self._tx_conn.set(conn)
+        try:
+            yield
+            # commit() на aborted транзакции молча делает rollback -
+            # не даём вызывающему думать, что изменения сохранены
+            if conn.info.transaction_status == TRANSACTION_STATUS_INERROR:
+                raise RuntimeError("Transaction aborted by an earlier error, rolled back")
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                # Не подменяем исходное исключение ошибкой rollback (например, закрытое соединение)
+                self.logger.error("Failed to roll back transaction", rollback_error)
+            self._prepared_conns.discard(conn)
+            raise
+        finally:
+            self._tx_conn.reset(token)
+            self._feature_cache.clear()
+            self.postgres.put_connection(conn)
+
+    def upsert(self, client: Client, expect_new: bool = False) -> None:
         """
         Insert or update client in database.
 
         Uses PostgreSQL ON CONFLICT DO UPDATE (upsert) for idempotent writes.
         Event Carried State Transfer pattern - полностью заменяем данные клиента.
 
+        С expect_new=True сначала пробуем обычный INSERT и только при
+        UniqueViolation делаем UPDATE. Выигрывает, только если конфликты
+        редки (например, первичная загрузка клиентов); иначе медленнее.
+
         Args:
             client: Client to upsert
+            expect_new: Client is most likely not in the table yet
         """
-        conn = self.postgres.get_connection()
+        conn = self._acquire()
         try:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO clients (
-                        id, name, organization_id, contact_email, contact_phone,
-                        status, features_enabled, config_confirmed, config_confirmed_by,
-                        config_confirmed_at, source, created_at, updated_at, synced_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT (id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        organization_id = EXCLUDED.organization_id,
-                        contact_email = EXCLUDED.contact_email,
-                        contact_phone = EXCLUDED.contact_phone,
-                        status = EXCLUDED.status,
-                        features_enabled = EXCLUDED.features_enabled,
-                        config_confirmed = EXCLUDED.config_confirmed,
-                        config_confirmed_by = EXCLUDED.config_confirmed_by,
-                        config_confirmed_at = EXCLUDED.config_confirmed_at,
-                        source = EXCLUDED.source,
-                        updated_at = EXCLUDED.updated_at,
-                        synced_at = EXCLUDED.synced_at
-                    """,
-                    (
-                        str(client.id),
-                        client.name,
-                        client.organization_id,
-                        client.contact_email,
-                        client.contact_phone,
-                        client.status,
-                        json.dumps(client.features_enabled),
-                        client.config_confirmed,
-                        client.config_confirmed_by,
-                        client.config_confirmed_at,
-                        client.source,
-                        client.created_at,
-                        client.updated_at,
-                        client.synced_at,
-                    ),
-                )
-                conn.commit()
+                if expect_new:
+                    self._insert_or_update(cur, self._client_to_row(client))
+                elif self.use_prepared_statements:
+                    self._ensure_upsert_prepared(conn)
+                    cur.execute(_EXECUTE_UPSERT_SQL, self._client_to_row(client))
+                else:
+                    cur.execute(_UPSERT_SQL, self._client_to_row(client))
+                self._commit(conn)
+            self._feature_cache.clear()
 
             self.logger.info(
                 f"Client upserted: {client.id}",
@@ -89,7 +249,7 @@ class ClientRepository:
             )
 
         except Exception as e:
-            conn.rollback()
+            self._rollback(conn)
             self.logger.error(
                 f"Failed to upsert client {client.id}",
                 e,
@@ -97,7 +257,47 @@ class ClientRepository:
             )
             raise
         finally:
-            self.postgres.put_connection(conn)
+            self._release(conn)
+
+    def upsert_many(self, clients: Sequence[Client]) -> None:
+        """
+        Insert or update multiple clients in one statement.
+
+        Multi-row INSERT ... ON CONFLICT через execute_values вместо
+        отдельного round-trip на каждого клиента. Один commit на весь батч.
+
+        Args:
+            clients: Clients to upsert
+        """
+        if not clients:
+            return
+
+        # ON CONFLICT не может обновить одну строку дважды в одном statement,
+        # поэтому оставляем последнее состояние каждого клиента
+        rows = [self._client_to_row(c) for c in {c.id: c for c in clients}.values()]
+
+        conn = self._acquire()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, _UPSERT_MANY_SQL, rows, page_size=500)
+                self._commit(conn)
+            self._feature_cache.clear()
+
+            self.logger.info(
+                f"Clients upserted: {len(rows)}",
+                param("count", len(rows)),
+            )
+
+        except Exception as e:
+            self._rollback(conn)
+            self.logger.error(
+                "Failed to upsert clients batch",
+                e,
+                param("count", len(rows)),
+            )
+            raise
+        finally:
+            self._release(conn)
 
     def get_by_id(self, client_id: UUID) -> Client | None:
         """
@@ -109,19 +309,10 @@ class ClientRepository:
         Returns:
             Client if found, None otherwise
         """
-        conn = self.postgres.get_connection()
+        conn = self._acquire()
         try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(
-                    """
-                    SELECT id, name, organization_id, contact_email, contact_phone,
-                           status, features_enabled, config_confirmed, config_confirmed_by,
-                           config_confirmed_at, source, created_at, updated_at, synced_at
-                    FROM clients
-                    WHERE id = %s
-                    """,
-                    (str(client_id),),
-                )
+            with conn.cursor() as cur:
+                cur.execute(_SELECT_BY_ID_SQL, (client_id,))
                 row = cur.fetchone()
 
             if not row:
@@ -130,7 +321,32 @@ class ClientRepository:
             return self._row_to_client(row)
 
         finally:
-            self.postgres.put_connection(conn)
+            self._release(conn)
+
+    def get_many(self, client_ids: Sequence[UUID]) -> dict[UUID, Client]:
+        """
+        Get multiple clients by ID in one query.
+
+        Args:
+            client_ids: Client UUIDs
+
+        Returns:
+            Dict client_id -> Client (отсутствующие ID не попадают в результат)
+        """
+        if not client_ids:
+            return {}
+
+        conn = self._acquire()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(_SELECT_MANY_SQL, (list(client_ids),))
+                rows = cur.fetchall()
+
+            clients = (self._row_to_client(row) for row in rows)
+            return {client.id: client for client in clients}
+
+        finally:
+            self._release(conn)
 
     def get_all_active(self) -> list[Client]:
         """
@@ -139,25 +355,16 @@ class ClientRepository:
         Returns:
             List of active clients
         """
-        conn = self.postgres.get_connection()
+        conn = self._acquire()
         try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(
-                    """
-                    SELECT id, name, organization_id, contact_email, contact_phone,
-                           status, features_enabled, config_confirmed, config_confirmed_by,
-                           config_confirmed_at, source, created_at, updated_at, synced_at
-                    FROM clients
-                    WHERE status = 'active'
-                    ORDER BY name
-                    """
-                )
+            with conn.cursor() as cur:
+                cur.execute(_SELECT_ACTIVE_SQL)
                 rows = cur.fetchall()
 
             return [self._row_to_client(row) for row in rows]
 
         finally:
-            self.postgres.put_connection(conn)
+            self._release(conn)
 
     def get_clients_with_feature(self, feature: str) -> list[Client]:
         """
@@ -169,48 +376,136 @@ class ClientRepository:
         Returns:
             List of clients with the feature enabled
         """
-        conn = self.postgres.get_connection()
+        # Внутри транзакции читаем напрямую: там могут быть незакоммиченные изменения
+        in_tx = self._tx_conn.get() is not None
+        if not in_tx:
+            cached = self._feature_cache.get(feature)
+            if cached and time.monotonic() - cached[0] < _FEATURE_CACHE_TTL:
+                return list(cached[1])
+
+        conn = self._acquire()
         try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # JSONB query: features_enabled->>'feature_name' = 'true'
-                cur.execute(
-                    """
-                    SELECT id, name, organization_id, contact_email, contact_phone,
-                           status, features_enabled, config_confirmed, config_confirmed_by,
-                           config_confirmed_at, source, created_at, updated_at, synced_at
-                    FROM clients
-                    WHERE status = 'active'
-                      AND (features_enabled->>%s)::boolean = true
-                    ORDER BY name
-                    """,
-                    (feature,),
-                )
+            with conn.cursor() as cur:
+                cur.execute(_SELECT_WITH_FEATURE_SQL, (feature,))
                 rows = cur.fetchall()
 
-            return [self._row_to_client(row) for row in rows]
+            clients = [self._row_to_client(row) for row in rows]
 
         finally:
+            self._release(conn)
+
+        if not in_tx:
+            self._feature_cache[feature] = (time.monotonic(), clients)
+        return list(clients)
+
+    def _acquire(self) -> Connection:
+        """Соединение открытой транзакции или новое из пула."""
+        tx_conn = self._tx_conn.get()
+        if tx_conn is not None:
+            return tx_conn
+        return self.postgres.get_connection()
+
+    def _release(self, conn: Connection) -> None:
+        """Возвращает соединение в пул (кроме соединения транзакции)."""
+        if conn is not self._tx_conn.get():
             self.postgres.put_connection(conn)
 
-    def _row_to_client(self, row: dict[str, Any]) -> Client:
-        """Convert database row to Client domain object."""
-        features = row["features_enabled"]
+    def _commit(self, conn: Connection) -> None:
+        """Commit, если операция не внутри transaction()."""
+        if conn is not self._tx_conn.get():
+            conn.commit()
+
+    def _rollback(self, conn: Connection) -> None:
+        """Rollback, если операция не внутри transaction()."""
+        if conn is not self._tx_conn.get():
+            conn.rollback()
+            # Состояние PREPARE после ошибки неизвестно - перепроверим при следующем вызове
+            self._prepared_conns.discard(conn)
+
+    @staticmethod
+    def _insert_or_update(cur: Cursor, row: tuple[Any, ...]) -> None:
+        """INSERT без ON CONFLICT с fallback на UPDATE при UniqueViolation."""
+        try:
+            cur.execute(_INSERT_NEW_SQL, row)
+        except UniqueViolation:
+            cur.execute("ROLLBACK TO SAVEPOINT client_insert")
+            # UPDATE: все колонки кроме id и created_at, id - в WHERE
+            cur.execute(_UPDATE_SQL, row[1:11] + row[12:] + row[:1])
+
+    def _ensure_upsert_prepared(self, conn: Connection) -> None:
+        """Готовит prepared statement для upsert на соединении (один раз)."""
+        if conn in self._prepared_conns:
+            return
+
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT 1 FROM pg_prepared_statements WHERE name = %s",
+                (_UPSERT_STATEMENT,),
+            )
+            if cur.fetchone() is None:
+                cur.execute(_PREPARE_UPSERT_SQL)
+
+        self._prepared_conns.add(conn)
+
+    @staticmethod
+    def _client_to_row(client: Client) -> tuple[Any, ...]:
+        """Convert Client to INSERT parameters (порядок колонок clients)."""
+        return (
+            client.id,
+            client.name,
+            client.organization_id,
+            client.contact_email,
+            client.contact_phone,
+            client.status,
+            Json(client.features_enabled, dumps=_dumps_json),
+            client.config_confirmed,
+            client.config_confirmed_by,
+            client.config_confirmed_at,
+            client.source,
+            client.created_at,
+            client.updated_at,
+            client.synced_at,
+        )
+
+    def _row_to_client(self, row: tuple[Any, ...]) -> Client:
+        """Convert database row to Client domain object.
+
+        Row - tuple в порядке колонок SELECT (без RealDictCursor, чтобы
+        не создавать dict на каждую строку).
+        """
+        (
+            client_id,
+            name,
+            organization_id,
+            contact_email,
+            contact_phone,
+            status,
+            features,
+            config_confirmed,
+            config_confirmed_by,
+            config_confirmed_at,
+            source,
+            created_at,
+            updated_at,
+            synced_at,
+        ) = row
+
         if isinstance(features, str):
-            features = json.loads(features)
+            features = orjson.loads(features)
 
         return Client(
-            id=UUID(str(row["id"])),
-            name=row["name"],
-            organization_id=row["organization_id"],
-            contact_email=row["contact_email"],
-            contact_phone=row["contact_phone"],
-            status=row["status"],
+            id=client_id,
+            name=name,
+            organization_id=organization_id,
+            contact_email=contact_email,
+            contact_phone=contact_phone,
+            status=status,
             features_enabled=features or {},
-            config_confirmed=row["config_confirmed"],
-            config_confirmed_by=row["config_confirmed_by"],
-            config_confirmed_at=row["config_confirmed_at"],
-            source=row["source"],
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-            synced_at=row["synced_at"],
+            config_confirmed=config_confirmed,
+            config_confirmed_by=config_confirmed_by,
+            config_confirmed_at=config_confirmed_at,
+            source=source,
+            created_at=created_at,
+            updated_at=updated_at,
+            synced_at=synced_at,
         )
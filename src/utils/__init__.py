@@ -0,0 +1,5 @@
+"""Shared helpers for SecretMagic."""
+
+from src.utils.time import utcnow
+
+__all__ = ["utcnow"]
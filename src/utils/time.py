@@ -0,0 +1,8 @@
+"""Time helpers."""
+
+from datetime import UTC, datetime
+
+
+def utcnow() -> datetime:
+    """Текущее время в UTC (naive, как раньше давал deprecated datetime.utcnow)."""
+    return datetime.now(UTC).replace(tzinfo=None)
@@ -0,0 +1,11 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+from src.logger.logger import init_logger
+
+
+@pytest.fixture(autouse=True)
+def _logger() -> None:
+    """Глобальный logger без writer (fallback в stdout)."""
+    init_logger(service_name="secretmagic-test", environment="test")
@@ -0,0 +1,386 @@
+"""Unit tests for ClientRepository (fake psycopg2 connection/pool)."""
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any
+from uuid import UUID, uuid4
+
+import pytest
+from psycopg2 import InterfaceError
+from psycopg2.errors import UniqueViolation
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR
+
+from src.domain.client import Client
+from src.repository import client_repository
+from src.repository.client_repository import ClientRepository
+
+
+class FakeCursor:
+    """Cursor: пишет SQL в connection, ответы и ошибки задаются тестом."""
+
+    def __init__(self, conn: "FakeConnection") -> None:
+        self.conn = conn
+        self.connection = conn  # нужен execute_values
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+    def execute(self, query: str | bytes, params: Any = None) -> None:
+        if isinstance(query, bytes):  # execute_values отдаёт уже собранный SQL
+            query = query.decode()
+        self.conn.executed.append((query, params))
+        if self.conn.fail_on and self.conn.fail_on(query):
+            self.conn.info.transaction_status = TRANSACTION_STATUS_INERROR
+            raise UniqueViolation("duplicate key value violates unique constraint")
+
+    def mogrify(self, template: bytes, args: tuple[Any, ...]) -> bytes:
+        self.conn.values_rows.append(args)
+        return template
+
+    def fetchone(self) -> tuple[Any, ...] | None:
+        return self.conn.rows[0] if self.conn.rows else None
+
+    def fetchall(self) -> list[tuple[Any, ...]]:
+        return list(self.conn.rows)
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.executed: list[tuple[str, Any]] = []
+        self.rows: list[tuple[Any, ...]] = []
+        self.values_rows: list[tuple[Any, ...]] = []  # строки VALUES из execute_values
+        self.encoding = "UTF8"
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail_on: Callable[[str], bool] | None = None
+        self.closed = False
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self) -> None:
+        if self.closed:
+            raise InterfaceError("connection already closed")
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def queries(self, fragment: str) -> list[tuple[str, Any]]:
+        return [(q, p) for q, p in self.executed if fragment in q]
+
+
+class FakePostgres:
+    """Пул из одного соединения."""
+
+    def __init__(self) -> None:
+        self.conn = FakeConnection()
+        self.config = SimpleNamespace(prepared_statements=False)
+        self.checked_out = 0
+
+    def get_connection(self) -> FakeConnection:
+        self.checked_out += 1
+        return self.conn
+
+    def put_connection(self, conn: FakeConnection) -> None:
+        self.checked_out -= 1
+
+
+def make_client(name: str = "Client") -> Client:
+    return Client(
+        id=uuid4(), name=name, organization_id="org", features_enabled={"autoorder": True}
+    )
+
+
+def client_row(client_id: UUID, name: str) -> tuple[Any, ...]:
+    now = datetime(2025, 1, 1)
+    return (
+        client_id, name, "org", None, None, "active", {"autoorder": True},
+        False, None, None, None, now, now, now,
+    )  # fmt: skip
+
+
+@pytest.fixture
+def postgres() -> FakePostgres:
+    return FakePostgres()
+
+
+@pytest.fixture
+def repo(postgres: FakePostgres) -> ClientRepository:
+    return ClientRepository(postgres)  # type: ignore[arg-type]
+
+
+# --- transaction() ---
+
+
+def test_upsert_commits_without_transaction(repo: ClientRepository, postgres: FakePostgres) -> None:
+    repo.upsert(make_client())
+
+    assert postgres.conn.commits == 1
+    assert postgres.checked_out == 0
+
+
+def test_transaction_commits_once(repo: ClientRepository, postgres: FakePostgres) -> None:
+    with repo.transaction():
+        repo.upsert(make_client("a"))
+        repo.upsert(make_client("b"))
+        assert postgres.conn.commits == 0
+        assert postgres.checked_out == 1
+
+    assert postgres.conn.commits == 1
+    assert postgres.conn.rollbacks == 0
+    assert postgres.checked_out == 0
+
+
+def test_transaction_rolls_back_on_exception(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    with pytest.raises(ValueError), repo.transaction():
+        repo.upsert(make_client())
+        raise ValueError("boom")
+
+    assert postgres.conn.commits == 0
+    assert postgres.conn.rollbacks == 1
+    assert postgres.checked_out == 0
+
+
+def test_transaction_rolls_back_on_base_exception(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    with pytest.raises(KeyboardInterrupt), repo.transaction():
+        raise KeyboardInterrupt
+
+    assert postgres.conn.rollbacks == 1
+    assert postgres.checked_out == 0
+
+
+def test_transaction_refuses_to_commit_aborted_transaction(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    postgres.conn.fail_on = lambda q: "ON CONFLICT" in q
+
+    with pytest.raises(RuntimeError, match="aborted"), repo.transaction():
+        with pytest.raises(UniqueViolation):
+            repo.upsert(make_client())
+
+    assert postgres.conn.commits == 0
+    assert postgres.conn.rollbacks == 1
+
+
+def test_failed_rollback_keeps_original_exception(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    with pytest.raises(ValueError, match="boom"), repo.transaction():
+        postgres.conn.closed = True
+        raise ValueError("boom")
+
+    assert postgres.checked_out == 0
+
+
+async def test_transaction_is_not_shared_with_other_tasks(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    entered = asyncio.Event()
+    other_done = asyncio.Event()
+
+    async def in_transaction() -> None:
+        with repo.transaction():
+            repo.upsert(make_client("a"))
+            entered.set()
+            await other_done.wait()
+
+    async def outside() -> None:
+        await entered.wait()
+        repo.upsert(make_client("b"))  # своё соединение и свой commit
+        other_done.set()
+
+    task = asyncio.create_task(in_transaction())
+    await outside()
+    assert postgres.conn.commits == 1
+    await task
+
+    assert postgres.conn.commits == 2
+    assert postgres.checked_out == 0
+
+
+def test_nested_transaction_is_rejected(repo: ClientRepository) -> None:
+    with repo.transaction(), pytest.raises(RuntimeError, match="Nested"), repo.transaction():
+        pass
+
+
+# --- upsert_many ---
+
+
+def test_upsert_many_keeps_last_state_per_client(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    first, other = make_client("old"), make_client("other")
+    renamed = Client(id=first.id, name="new", organization_id="org")
+
+    repo.upsert_many([first, other, renamed])
+
+    assert len(postgres.conn.queries("ON CONFLICT")) == 1
+    names = {row[0]: row[1] for row in postgres.conn.values_rows}
+    assert names == {first.id: "new", other.id: "other"}
+    assert postgres.conn.commits == 1
+
+
+def test_upsert_many_empty_input(repo: ClientRepository, postgres: FakePostgres) -> None:
+    repo.upsert_many([])
+
+    assert postgres.conn.executed == []
+    assert postgres.conn.commits == 0
+    assert postgres.checked_out == 0
+
+
+def test_upsert_many_pages_by_500_rows(repo: ClientRepository, postgres: FakePostgres) -> None:
+    repo.upsert_many([make_client(str(i)) for i in range(1201)])
+
+    pages = [q.count("(%s") for q, _ in postgres.conn.queries("ON CONFLICT")]
+    assert pages == [500, 500, 201]
+    assert len(postgres.conn.values_rows) == 1201
+    assert postgres.conn.commits == 1
+    assert postgres.checked_out == 0
+
+
+def test_features_json_accepts_non_string_keys() -> None:
+    # Как json.dumps на baseline: нестроковые ключи приводятся к str
+    assert client_repository._dumps_json({1: True, "a": False}) == '{"1":true,"a":false}'
+
+
+# --- prepared statement (DB_PREPARED_STATEMENTS=true) ---
+
+
+@pytest.fixture
+def prepared_repo(postgres: FakePostgres) -> ClientRepository:
+    postgres.config.prepared_statements = True
+    return ClientRepository(postgres)  # type: ignore[arg-type]
+
+
+def test_upsert_prepares_statement_once_per_connection(
+    prepared_repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    first_conn = postgres.conn
+    prepared_repo.upsert(make_client("a"))
+    prepared_repo.upsert(make_client("b"))
+
+    assert len(first_conn.queries("pg_prepared_statements")) == 1
+    assert len(first_conn.queries("PREPARE client_upsert")) == 1
+    assert len(first_conn.queries("EXECUTE client_upsert")) == 2
+
+    # Другое соединение из пула - свой PREPARE
+    postgres.conn = FakeConnection()
+    prepared_repo.upsert(make_client("c"))
+    assert len(postgres.conn.queries("PREPARE client_upsert")) == 1
+    assert len(first_conn.queries("PREPARE client_upsert")) == 1
+
+
+def test_upsert_reuses_statement_prepared_in_session(
+    prepared_repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    postgres.conn.rows = [(1,)]  # уже есть в pg_prepared_statements
+
+    prepared_repo.upsert(make_client())
+
+    assert postgres.conn.queries("PREPARE client_upsert") == []
+    assert len(postgres.conn.queries("EXECUTE client_upsert")) == 1
+
+
+def test_upsert_reprobes_prepared_statement_after_failure(
+    prepared_repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    prepared_repo.upsert(make_client("a"))
+    postgres.conn.fail_on = lambda q: q.startswith("EXECUTE")
+
+    with pytest.raises(UniqueViolation):
+        prepared_repo.upsert(make_client("b"))
+    assert postgres.conn.rollbacks == 1
+
+    postgres.conn.fail_on = None
+    prepared_repo.upsert(make_client("c"))
+    assert len(postgres.conn.queries("pg_prepared_statements")) == 2
+
+
+# --- upsert(expect_new=True) ---
+
+
+def test_expect_new_inserts_without_conflict_clause(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    repo.upsert(make_client(), expect_new=True)
+
+    ((query, _params),) = postgres.conn.executed
+    assert "SAVEPOINT client_insert" in query
+    assert "ON CONFLICT" not in query
+    assert postgres.conn.commits == 1
+
+
+def test_expect_new_falls_back_to_update(repo: ClientRepository, postgres: FakePostgres) -> None:
+    client = make_client()
+    postgres.conn.fail_on = lambda q: "SAVEPOINT client_insert;" in q
+
+    repo.upsert(client, expect_new=True)
+
+    queries = [q.strip() for q, _ in postgres.conn.executed]
+    assert queries[1] == "ROLLBACK TO SAVEPOINT client_insert"
+    _update_sql, update_params = postgres.conn.queries("UPDATE clients")[0]
+    assert update_params[0] == client.name
+    assert update_params[-1] == client.id
+    assert len(update_params) == 13
+    assert postgres.conn.commits == 1
+    assert postgres.conn.rollbacks == 0
+
+
+# --- get_clients_with_feature cache ---
+
+
+def test_feature_cache_hits_within_ttl(
+    repo: ClientRepository, postgres: FakePostgres, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(client_repository.time, "monotonic", lambda: now[0])
+    postgres.conn.rows = [client_row(uuid4(), "a")]
+
+    first = repo.get_clients_with_feature("autoorder")
+    first.clear()  # вызывающий получает копию, кеш не портится
+    second = repo.get_clients_with_feature("autoorder")
+
+    assert len(second) == 1
+    assert len(postgres.conn.queries("features_enabled->>")) == 1
+
+    now[0] += client_repository._FEATURE_CACHE_TTL + 1
+    repo.get_clients_with_feature("autoorder")
+    assert len(postgres.conn.queries("features_enabled->>")) == 2
+
+
+def test_feature_cache_invalidated_on_upsert(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    postgres.conn.rows = [client_row(uuid4(), "a")]
+    repo.get_clients_with_feature("autoorder")
+
+    repo.upsert(make_client())
+    repo.get_clients_with_feature("autoorder")
+
+    assert len(postgres.conn.queries("features_enabled->>")) == 2
+
+
+def test_feature_cache_bypassed_inside_transaction(
+    repo: ClientRepository, postgres: FakePostgres
+) -> None:
+    postgres.conn.rows = [client_row(uuid4(), "a")]
+
+    with repo.transaction():
+        repo.get_clients_with_feature("autoorder")
+        repo.get_clients_with_feature("autoorder")
+
+    assert len(postgres.conn.queries("features_enabled->>")) == 2
+    assert repo._feature_cache == {}
@@ -0,0 +1,305 @@
+"""Unit tests for StarRocksClient (без реального StarRocks)."""
+
+from typing import Any
+
+import pymysql
+import pytest
+
+from src.database import starrocks
+from src.database.starrocks import StarRocksClient, StarRocksConfig
+
+
+class FakeCursor:
+    """Cursor, записывающий выполненные запросы."""
+
+    def __init__(self, conn: "FakeConnection") -> None:
+        self.conn = conn
+        self.rowcount = 0
+        self.offset = 0
+
+    def execute(self, query: str, params: Any = None) -> None:
+        if self.conn.dead:
+            raise pymysql.OperationalError(2013, "Lost connection")
+        if self.conn.fail_with is not None:
+            raise self.conn.fail_with
+        self.conn.now += self.conn.execute_seconds
+        self.conn.executed.append((query, params))
+        self.rowcount = query.count("(%s")  # число строк в multi-row VALUES
+
+    def fetchone(self) -> dict[str, Any] | None:
+        return self.conn.rows[0] if self.conn.rows else None
+
+    def fetchall(self) -> list[dict[str, Any]]:
+        return list(self.conn.rows)
+
+    def fetchmany(self, size: int) -> list[dict[str, Any]]:
+        batch = self.conn.rows[self.offset : self.offset + size]
+        self.offset += len(batch)
+        self.conn.fetch_sizes.append(len(batch))
+        return batch
+
+    def close(self) -> None:
+        self.conn.closed_cursors += 1
+
+
+class FakeConnection:
+    """Соединение, которое может «умереть» незаметно для open."""
+
+    def __init__(self) -> None:
+        self.open = True
+        self.dead = False
+        self.pings = 0
+        self.executed: list[tuple[str, Any]] = []
+        self.rows: list[dict[str, Any]] = []
+        self.fail_with: pymysql.Error | None = None
+        self.fetch_sizes: list[int] = []
+        self.closed_cursors = 0
+        self.cursor_classes: list[Any] = []
+        # Фейковые часы: каждый execute «длится» execute_seconds
+        self.now = 1000.0
+        self.execute_seconds = 0.0
+
+    def ping(self, reconnect: bool = False) -> None:
+        self.pings += 1
+        if self.dead and reconnect:
+            self.dead = False
+
+    def cursor(self, cursor_class: Any = None) -> FakeCursor:
+        self.cursor_classes.append(cursor_class)
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def client() -> StarRocksClient:
+    client = StarRocksClient(StarRocksConfig(user="u", password="p", ping_interval=30.0))
+    client._connection = FakeConnection()  # type: ignore[assignment]
+    return client
+
+
+@pytest.fixture
+def conn(client: StarRocksClient, monkeypatch: pytest.MonkeyPatch) -> FakeConnection:
+    """Соединение клиента; time.monotonic в starrocks идёт по его фейковым часам."""
+    fake: FakeConnection = client._connection  # type: ignore[assignment]
+    monkeypatch.setattr(starrocks.time, "monotonic", lambda: fake.now)
+    return fake
+
+
+def batch_sizes(conn: FakeConnection) -> list[int]:
+    """Число строк в каждом выполненном INSERT."""
+    return [query.count("(%s") for query, _ in conn.executed if query.startswith("INSERT")]
+
+
+def test_recent_connection_is_not_pinged(client: StarRocksClient) -> None:
+    client.execute("SELECT 1")
+    client.execute("SELECT 1")
+
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    assert conn.pings == 1  # только первый вызов (соединение ещё не использовалось)
+
+
+def test_read_reconnects_and_retries_after_connection_drop(client: StarRocksClient) -> None:
+    client.execute("SELECT 1")
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    conn.rows = [{"x": 1}]
+    conn.dead = True
+
+    # Обрыв внутри ping_interval: запрос падает, ping(reconnect=True), повтор
+    assert client.fetch_one("SELECT x") == {"x": 1}
+    assert not conn.dead
+    assert conn.pings == 2
+
+
+def test_read_does_not_retry_other_errors(client: StarRocksClient) -> None:
+    client.execute("SELECT 1")
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    conn.fail_with = pymysql.OperationalError(1064, "Syntax error")
+
+    with pytest.raises(pymysql.OperationalError):
+        client.fetch_all("SELEC x")
+    assert conn.executed == [("SELECT 1", None)]
+
+
+def test_write_is_not_retried_after_connection_drop(client: StarRocksClient) -> None:
+    client.execute("SELECT 1")
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    conn.dead = True
+
+    # Write не повторяем (может быть неидемпотентным)
+    with pytest.raises(pymysql.OperationalError):
+        client.execute("INSERT INTO t VALUES (1)")
+
+    # Следующий вызов пингует (reconnect) и проходит
+    client.execute("INSERT INTO t VALUES (1)")
+    assert not conn.dead
+    assert conn.pings == 2
+
+
+def test_closed_connection_is_pinged(client: StarRocksClient) -> None:
+    client.execute("SELECT 1")
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    conn.open = False
+
+    client.execute("SELECT 1")
+    assert conn.pings == 2
+
+
+# --- fetch_iter ---
+
+
+def test_fetch_iter_streams_in_arraysize_chunks(client: StarRocksClient) -> None:
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    conn.rows = [{"id": i} for i in range(5)]
+
+    rows = list(client.fetch_iter("SELECT id FROM t", arraysize=2))
+
+    assert rows == conn.rows
+    assert conn.cursor_classes == [starrocks.SSDictCursor]
+    assert conn.fetch_sizes == [2, 2, 1, 0]
+    assert conn.closed_cursors == 1
+
+
+def test_fetch_iter_closes_cursor_on_early_exit(client: StarRocksClient) -> None:
+    conn: FakeConnection = client._connection  # type: ignore[assignment]
+    conn.rows = [{"id": i} for i in range(5)]
+
+    rows = client.fetch_iter("SELECT id FROM t", arraysize=2)
+    assert next(rows) == {"id": 0}
+    rows.close()
+
+    assert conn.fetch_sizes == [2]
+    assert conn.closed_cursors == 1
+
+
+# --- insert_many ---
+
+
+def test_insert_many_splits_into_fixed_batches(
+    client: StarRocksClient, conn: FakeConnection
+) -> None:
+    rows = [(i, f"name-{i}") for i in range(5)]
+
+    inserted = client.insert_many("t", ["id", "name"], rows, batch_size=2)
+
+    assert inserted == 5
+    assert batch_sizes(conn) == [2, 2, 1]
+    query, params = conn.executed[0]
+    assert query == "INSERT INTO t (`id`, `name`) VALUES (%s, %s), (%s, %s)"
+    assert params == (0, "name-0", 1, "name-1")
+
+
+def test_insert_many_caps_batch_by_placeholders(
+    client: StarRocksClient, conn: FakeConnection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(starrocks, "MAX_PLACEHOLDERS", 7)  # 3 колонки -> максимум 2 строки
+
+    inserted = client.insert_many("t", ["a", "b", "c"], [(1, 2, 3)] * 5, batch_size=100)
+
+    assert inserted == 5
+    assert batch_sizes(conn) == [2, 2, 1]
+
+
+def test_insert_many_reads_rows_lazily(client: StarRocksClient, conn: FakeConnection) -> None:
+    rows = ((i,) for i in range(3))
+
+    assert client.insert_many("t", ["id"], rows, batch_size=2) == 3
+    assert batch_sizes(conn) == [2, 1]
+
+
+def test_insert_many_empty_rows(client: StarRocksClient, conn: FakeConnection) -> None:
+    assert client.insert_many("t", ["id"], []) == 0
+    assert conn.executed == []
+
+
+def test_insert_many_rejects_empty_columns(client: StarRocksClient) -> None:
+    with pytest.raises(ValueError):
+        client.insert_many("t", [], [()])
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_insert_many_rejects_invalid_batch_size(client: StarRocksClient, batch_size: int) -> None:
+    with pytest.raises(ValueError, match="batch_size"):
+        client.insert_many("t", ["id"], [(1,)], batch_size=batch_size)
+
+
+def test_adaptive_batch_grows_while_fast(
+    client: StarRocksClient, conn: FakeConnection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(starrocks, "MAX_PLACEHOLDERS", 16)  # 2 колонки -> максимум 8 строк
+    client._insert_batch_size = 2
+
+    client.insert_many("t", ["a", "b"], [(1, 2)] * 24)
+
+    # 2 -> 4 -> 8, дальше упирается в лимит placeholders
+    assert batch_sizes(conn) == [2, 4, 8, 8, 2]
+    assert client._insert_batch_size == 8
+
+
+def test_adaptive_batch_does_not_grow_on_partial_batch(
+    client: StarRocksClient, conn: FakeConnection
+) -> None:
+    client._insert_batch_size = 1000
+
+    client.insert_many("t", ["id"], [(1,)] * 10)
+
+    assert batch_sizes(conn) == [10]
+    assert client._insert_batch_size == 1000
+
+
+def test_adaptive_batch_shrinks_when_slow(
+    client: StarRocksClient, conn: FakeConnection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(starrocks, "MIN_INSERT_BATCH_SIZE", 2)
+    client._insert_batch_size = 8
+    conn.execute_seconds = 3 * starrocks.INSERT_BATCH_TARGET_SECONDS
+
+    client.insert_many("t", ["id"], [(1,)] * 20)
+
+    # 8 -> 4 -> 2, дальше не ниже минимума
+    assert batch_sizes(conn) == [8, 4, 2, 2, 2, 2]
+    assert client._insert_batch_size == 2
+
+
+def test_adaptive_batch_keeps_size_within_target(
+    client: StarRocksClient, conn: FakeConnection
+) -> None:
+    client._insert_batch_size = 1000
+    conn.execute_seconds = 1.5 * starrocks.INSERT_BATCH_TARGET_SECONDS
+
+    client.insert_many("t", ["id"], [(1,)] * 3000)
+
+    assert batch_sizes(conn) == [1000, 1000, 1000]
+    assert client._insert_batch_size == 1000
+
+
+def test_adaptive_batch_shrinks_on_error(client: StarRocksClient, conn: FakeConnection) -> None:
+    client._insert_batch_size = 600
+    client.execute("SELECT 1")  # соединение свежее - без ping перед INSERT
+    conn.dead = True
+
+    with pytest.raises(pymysql.OperationalError):
+        client.insert_many("t", ["id"], [(1,)] * 10)
+
+    assert client._insert_batch_size == starrocks.MIN_INSERT_BATCH_SIZE
+
+
+def test_adaptive_batch_keeps_size_on_data_error(
+    client: StarRocksClient, conn: FakeConnection
+) -> None:
+    client._insert_batch_size = 1000
+    conn.fail_with = pymysql.IntegrityError(1062, "Duplicate entry")
+
+    with pytest.raises(pymysql.IntegrityError):
+        client.insert_many("t", ["id"], [(1,)] * 10)
+
+    assert client._insert_batch_size == 1000
+
+
+def test_fixed_batch_size_leaves_adaptive_size_alone(
+    client: StarRocksClient, conn: FakeConnection
+) -> None:
+    client._insert_batch_size = 1000
+    conn.execute_seconds = 10.0
+
+    client.insert_many("t", ["id"], [(1,)] * 10, batch_size=5)
+
+    assert client._insert_batch_size == 1000
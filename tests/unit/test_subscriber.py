@@ -0,0 +1,84 @@
+"""Unit tests for EventSubscriber handler dispatch."""
+
+from typing import Any
+
+import pytest
+
+from src.events.subscriber import EventSubscriber
+
+
+class FakeRedis:
+    """Записывает XACK."""
+
+    def __init__(self) -> None:
+        self.acked: list[str] = []
+
+    async def xack(self, stream: str, group: str, message_id: str) -> None:
+        self.acked.append(message_id)
+
+
+class FakeRedisClient:
+    def __init__(self) -> None:
+        self.redis = FakeRedis()
+
+    def get_redis(self) -> FakeRedis:
+        return self.redis
+
+
+MESSAGE = {"event_id": "e1", "event_type": "clients_updated", "data": '{"id": 1}'}
+
+
+@pytest.fixture
+def subscriber() -> EventSubscriber:
+    return EventSubscriber(FakeRedisClient(), "secretmagic-test", ["clients-updates"])  # type: ignore[arg-type]
+
+
+async def test_async_handler_is_awaited(subscriber: EventSubscriber) -> None:
+    seen: list[dict[str, Any]] = []
+
+    async def handler(event: dict[str, Any]) -> None:
+        seen.append(event)
+
+    await subscriber._handle_message("clients-updates", "1-0", MESSAGE, handler)
+
+    assert seen[0]["data"] == {"id": 1}
+    assert subscriber.redis_client.redis.acked == ["1-0"]  # type: ignore[attr-defined]
+
+
+async def test_sync_handler_is_called(subscriber: EventSubscriber) -> None:
+    seen: list[dict[str, Any]] = []
+
+    await subscriber._handle_message("clients-updates", "1-0", MESSAGE, seen.append)
+
+    assert len(seen) == 1
+    assert subscriber.redis_client.redis.acked == ["1-0"]  # type: ignore[attr-defined]
+
+
+async def test_lambda_returning_coroutine_is_awaited(subscriber: EventSubscriber) -> None:
+    seen: list[dict[str, Any]] = []
+
+    async def handle(event: dict[str, Any]) -> None:
+        seen.append(event)
+
+    await subscriber._handle_message("clients-updates", "1-0", MESSAGE, lambda event: handle(event))
+
+    assert len(seen) == 1
+
+
+async def test_failed_handler_is_not_acked(subscriber: EventSubscriber) -> None:
+    async def handler(event: dict[str, Any]) -> None:
+        raise ValueError("boom")
+
+    await subscriber._handle_message("clients-updates", "1-0", MESSAGE, handler)
+
+    assert subscriber.redis_client.redis.acked == []  # type: ignore[attr-defined]
+
+
+def test_parse_event_keeps_big_integers_exact(subscriber: EventSubscriber) -> None:
+    event = subscriber._parse_event({"data": '{"n": 18446744073709551616}'})
+
+    assert event["data"] == {"n": 18446744073709551616}
+
+
+def test_parse_event_invalid_json_gives_empty_data(subscriber: EventSubscriber) -> None:
+    assert subscriber._parse_event({"data": "{not json"})["data"] == {}